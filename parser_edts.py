@@ -1,104 +1,275 @@
-import re
-from typing import Optional, Any, Dict, List
-
-
-TOKEN_SPEC = [
-    ("NUMBER", r"\d+(\.\d+)?"),
-    ("ID",     r"[a-zA-Z_]\w*"),
-    ("PLUS",   r"\+"),
-    ("MINUS",  r"-"),
-    ("MUL",    r"\*"),
-    ("DIV",    r"/"),
-    ("LPAREN", r"\("),
-    ("RPAREN", r"\)"),
-    ("SKIP",   r"[ \t]+"),
-    ("MISMATCH", r"."),
-]
-
-TOK_REGEX = "|".join("(?P<%s>%s)" % pair for pair in TOKEN_SPEC)
-
-class Token:
-    def __init__(self, type_: str, lexeme: str):
-        self.type = type_
-        self.lexeme = lexeme
-
-    def __repr__(self):
-        return f"Token({self.type}, '{self.lexeme}')"
-
-class Lexer:
-    def __init__(self, text: str):
-        self.text = text
-        self.gen = self._tokenize()
-
-    def _tokenize(self):
-        for mo in re.finditer(TOK_REGEX, self.text):
-            kind = mo.lastgroup
-            value = mo.group()
-            if kind == "NUMBER":
-                yield Token("NUMBER", value)
-            elif kind == "ID":
-                yield Token("ID", value)
-            elif kind in {"PLUS","MINUS","MUL","DIV","LPAREN","RPAREN"}:
-                yield Token(kind, value)
-            elif kind == "SKIP":
-                continue
-            elif kind == "MISMATCH":
-                raise SyntaxError(f"Caracter inválido: {value!r}")
-        yield Token("EOF", "")
-
-    def next(self):
-        return next(self.gen)
+import ast as pyast
+import functools
+import operator
+import weakref
+from collections.abc import MutableMapping
+from typing import Optional, Any, Dict, List, Tuple
+
+try:  # numba/numpy son opcionales: sin ellos run_jit usa el mismo bucle en Python
+    import numpy as np
+    from numba import njit
+except ImportError:
+    np = None
+    njit = None
+
+
+PLUS, MINUS, MUL, DIV, LPAREN, RPAREN, NUMBER, ID, EOF = range(9)
+
+TOKEN_NAMES = ("PLUS", "MINUS", "MUL", "DIV", "LPAREN", "RPAREN", "NUMBER", "ID", "EOF")
+
+_OP = {
+    "+": PLUS,
+    "-": MINUS,
+    "*": MUL,
+    "/": DIV,
+    "(": LPAREN,
+    ")": RPAREN,
+}
+
+# precedencia de operadores binarios (todos asociativos a izquierda)
+PREC = {PLUS: 1, MINUS: 1, MUL: 2, DIV: 2}
+
+def next_token(text: str, pos: int) -> Tuple[int, str, int]:
+    n = len(text)
+    i = pos
+    # el lexer original ignoraba también los saltos de línea
+    while i < n and text[i] in " \t\n":
+        i += 1
+    if i >= n:
+        return EOF, "", i
+    c = text[i]
+    start = i
+    if c.isdecimal():
+        i += 1
+        while i < n and text[i].isdecimal():
+            i += 1
+        # parte fraccionaria solo si hay dígitos tras el punto
+        if i + 1 < n and text[i] == "." and text[i + 1].isdecimal():
+            i += 2
+            while i < n and text[i].isdecimal():
+                i += 1
+        return NUMBER, text[start:i], i
+    if c == "_" or ("a" <= c <= "z") or ("A" <= c <= "Z"):
+        i += 1
+        while i < n and (text[i].isalnum() or text[i] == "_"):
+            i += 1
+        return ID, text[start:i], i
+    tok_type = _OP.get(c)
+    if tok_type is None:
+        raise SyntaxError(f"Caracter inválido: {c!r}")
+    return tok_type, c, i + 1
+
+_MISSING = object()
+
+# cada identificador recibe un slot global y estable, válido para cualquier SymbolTable
+_SLOTS: Dict[str, int] = {}
+_SLOT_NAMES: List[str] = []
+
+def intern_slot(name: str) -> int:
+    slot = _SLOTS.get(name)
+    if slot is None:
+        slot = _SLOTS[name] = len(_SLOT_NAMES)
+        _SLOT_NAMES.append(name)
+    return slot
 
 class ASTNode:
-    def __init__(self):
-        self.val: Optional[float] = None 
+    __slots__ = ()
+
+    def eval(self, symtab: "SymbolTable") -> float:
+        raise TypeError("Nodo AST desconocido")
 
 class NumberNode(ASTNode):
-    def __init__(self, number_text: str):
-        super().__init__()
-        self.number_text = number_text
-        self.val = float(number_text) if '.' in number_text else int(number_text)
+    __slots__ = ("value", "_text", "__weakref__")
+
+    def __init__(self, value: Any, number_text: Optional[str] = None):
+        self.value = value
+        # las constantes plegadas no tienen lexema; su texto se deriva al mostrarlas
+        self._text = number_text
+
+    @property
+    def number_text(self) -> str:
+        if self._text is None:
+            try:
+                self._text = repr(self.value)
+            except ValueError:  # enteros por encima del límite de conversión a str
+                self._text = f"<entero de {self.value.bit_length()} bits>"
+        return self._text
+
+    def eval(self, symtab: "SymbolTable") -> float:
+        return self.value
 
     def __repr__(self):
         return f"Number({self.number_text})"
 
 class IdNode(ASTNode):
+    __slots__ = ("name", "slot", "__weakref__")
+
     def __init__(self, name: str):
-        super().__init__()
         self.name = name
+        self.slot = intern_slot(name)
+
+    def eval(self, symtab: "SymbolTable") -> float:
+        sym = symtab.symbols.get(self.slot)
+        if sym is None:
+            raise NameError(f"Identificador no definido: {self.name}")
+        return sym.valor
 
     def __repr__(self):
         return f"Id({self.name})"
 
+# las hojas son inmutables, así que se comparten entre todos los árboles; las
+# referencias débiles dejan que una hoja desaparezca con el último árbol que la usa
+_NUM_CACHE: "weakref.WeakValueDictionary[str, NumberNode]" = weakref.WeakValueDictionary()
+_CONST_CACHE: "weakref.WeakValueDictionary[tuple, NumberNode]" = weakref.WeakValueDictionary()
+_ID_CACHE: "weakref.WeakValueDictionary[str, IdNode]" = weakref.WeakValueDictionary()
+
+def make_number(number_text: str) -> NumberNode:
+    node = _NUM_CACHE.get(number_text)
+    if node is None:
+        value = int(number_text) if number_text.isdecimal() else float(number_text)
+        node = _NUM_CACHE[number_text] = NumberNode(value, number_text)
+    return node
+
+def _number_key(value: Any) -> tuple:
+    # repr distingue 0.0 de -0.0 y 2 de 2.0; los enteros se usan tal cual
+    return (type(value), value if type(value) is int else repr(value))
+
+def make_constant(value: Any) -> NumberNode:
+    key = _number_key(value)
+    node = _CONST_CACHE.get(key)
+    if node is None:
+        node = _CONST_CACHE[key] = NumberNode(value)
+    return node
+
+def make_id(name: str) -> IdNode:
+    node = _ID_CACHE.get(name)
+    if node is None:
+        node = _ID_CACHE[name] = IdNode(name)
+    return node
+
+def _div(left: float, right: float) -> float:
+    if right == 0:
+        raise ZeroDivisionError("División por cero detectada en la evaluación")
+    return left / right
+
+_OPS = {"+": operator.add, "-": operator.sub, "*": operator.mul, "/": _div}
+
 class BinOpNode(ASTNode):
+    __slots__ = ("op", "left", "right", "fn")
+
     def __init__(self, op: str, left: ASTNode, right: ASTNode):
-        super().__init__()
         self.op = op  # '+', '-', '*', '/'
         self.left = left
         self.right = right
+        try:
+            self.fn = _OPS[op]
+        except KeyError:
+            raise ValueError(f"Operador desconocido: {op}") from None
+
+    def eval(self, symtab: "SymbolTable") -> float:
+        return self.fn(self.left.eval(symtab), self.right.eval(symtab))
 
     def __repr__(self):
         return f"BinOp({self.op}, {self.left}, {self.right})"
 
+def _is_int_literal(node: ASTNode, value: int) -> bool:
+    return isinstance(node, NumberNode) and type(node.value) is int and node.value == value
+
+def make_binop(op: str, left: ASTNode, right: ASTNode) -> ASTNode:
+    # plegado de constantes; los errores aritméticos (división por cero, desborde
+    # a float) se dejan para la evaluación
+    if isinstance(left, NumberNode) and isinstance(right, NumberNode):
+        try:
+            return make_constant(_OPS[op](left.value, right.value))
+        except ArithmeticError:
+            return BinOpNode(op, left, right)
+    # identidades con literales enteros que conservan valor y tipo para números,
+    # incluido -0.0; x + 0 se mantiene porque -0.0 + 0 da 0.0
+    if op == "-":
+        if _is_int_literal(right, 0):
+            return left
+    elif op == "*":
+        if _is_int_literal(right, 1):
+            return left
+        if _is_int_literal(left, 1):
+            return right
+    return BinOpNode(op, left, right)
+
 class Symbol:
+    __slots__ = ("name", "tipo", "_valor", "_table")
+
     def __init__(self, name: str, tipo: str = "number", valor: Any = None):
         self.name = name
         self.tipo = tipo
-        self.valor = valor
+        self._valor = valor
+        self._table: Optional["SymbolTable"] = None
+
+    @property
+    def valor(self) -> Any:
+        return self._valor
+
+    @valor.setter
+    def valor(self, valor: Any):
+        self._valor = valor
+        if self._table is not None:
+            self._table.version += 1
 
     def __repr__(self):
         return f"Symbol(name={self.name}, tipo={self.tipo}, valor={self.valor})"
 
+class _SymbolDict(MutableMapping):
+    # tabla por nombre (SymbolTable.table); cada escritura actualiza el índice
+    # por slot y la versión de la SymbolTable dueña
+    def __init__(self, owner: "SymbolTable"):
+        self._owner = owner
+        self._data: Dict[str, Symbol] = {}
+
+    def __getitem__(self, name: str) -> Symbol:
+        return self._data[name]
+
+    def __setitem__(self, name: str, sym: Symbol):
+        self._data[name] = sym
+        sym._table = self._owner
+        self._owner.symbols[intern_slot(name)] = sym
+        self._owner.version += 1
+
+    def __delitem__(self, name: str):
+        del self._data[name]
+        del self._owner.symbols[intern_slot(name)]
+        self._owner.version += 1
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __repr__(self):
+        return repr(self._data)
+
 class SymbolTable:
     def __init__(self):
-        self.table: Dict[str, Symbol] = {}
+        # los mismos Symbol indexados por slot; se mantiene desde table
+        self.symbols: Dict[int, Symbol] = {}
+        # se incrementa con cada alta o asignación a Symbol.valor
+        self.version = 0
+        self.table: MutableMapping[str, Symbol] = _SymbolDict(self)
 
     def add(self, name: str, tipo: str = "number", valor: Any = None):
         self.table[name] = Symbol(name, tipo, valor)
 
+    def intern(self, name: str) -> int:
+        return intern_slot(name)
+
     def get(self, name: str) -> Optional[Symbol]:
         return self.table.get(name)
 
+    def value_at(self, slot: int) -> Any:
+        sym = self.symbols.get(slot)
+        if sym is None:
+            raise NameError(f"Identificador no definido: {_SLOT_NAMES[slot]}")
+        return sym.valor
+
     def __repr__(self):
         lines = ["Tabla de símbolos:"]
         for k, s in self.table.items():
@@ -106,108 +277,300 @@ class SymbolTable:
         return "\n".join(lines)
 
 class Parser:
-    def __init__(self, lexer: Lexer):
-        self.lexer = lexer
-        self.lookahead: Token = self.lexer.next()
-
-    def eat(self, token_type: str):
-        if self.lookahead.type == token_type:
-            # print("eat", self.lookahead)
-            self.lookahead = self.lexer.next()
-        else:
-            raise SyntaxError(f"Se esperaba {token_type}, encontrado {self.lookahead}")
+    def __init__(self, text: str):
+        self.text = text
+        self.tok_type, self.tok_lex, self.pos = next_token(text, 0)
+
+    def _current(self) -> str:
+        return f"Token({TOKEN_NAMES[self.tok_type]}, '{self.tok_lex}')"
+
+    def eat(self, token_type: int):
+        if self.tok_type != token_type:
+            raise SyntaxError(f"Se esperaba {TOKEN_NAMES[token_type]}, encontrado {self._current()}")
+        self.tok_type, self.tok_lex, self.pos = next_token(self.text, self.pos)
 
     def parse(self) -> ASTNode:
         node = self.expr()
-        if self.lookahead.type != "EOF":
-            raise SyntaxError(f"Token extra al final: {self.lookahead}")
+        if self.tok_type != EOF:
+            raise SyntaxError(f"Token extra al final: {self._current()}")
         return node
 
-    def expr(self) -> ASTNode:
-        node = self.term()
-        while self.lookahead.type in ("PLUS", "MINUS"):
-            op = self.lookahead.lexeme
-            if self.lookahead.type == "PLUS":
-                self.eat("PLUS")
-            else:
-                self.eat("MINUS")
-            right = self.term()
-            node = BinOpNode(op, node, right)
+    def expr(self, min_prec: int = 1) -> ASTNode:
+        node = self.primary()
+        prec = PREC.get(self.tok_type, 0)
+        while prec >= min_prec:
+            op = self.tok_lex
+            self.eat(self.tok_type)
+            right = self.expr(prec + 1)
+            node = make_binop(op, node, right)
+            prec = PREC.get(self.tok_type, 0)
         return node
 
-    def term(self) -> ASTNode:
-        node = self.factor()
-        while self.lookahead.type in ("MUL", "DIV"):
-            op = self.lookahead.lexeme
-            if self.lookahead.type == "MUL":
-                self.eat("MUL")
-            else:
-                self.eat("DIV")
-            right = self.factor()
-            node = BinOpNode(op, node, right)
-        return node
-
-    def factor(self) -> ASTNode:
-        if self.lookahead.type == "LPAREN":
-            self.eat("LPAREN")
+    def primary(self) -> ASTNode:
+        tt = self.tok_type
+        lexeme = self.tok_lex
+        if tt == NUMBER:
+            self.tok_type, self.tok_lex, self.pos = next_token(self.text, self.pos)
+            return make_number(lexeme)
+        if tt == ID:
+            self.tok_type, self.tok_lex, self.pos = next_token(self.text, self.pos)
+            return make_id(lexeme)
+        if tt == LPAREN:
+            self.tok_type, self.tok_lex, self.pos = next_token(self.text, self.pos)
             node = self.expr()
-            self.eat("RPAREN")
+            self.eat(RPAREN)
             return node
-        elif self.lookahead.type == "NUMBER":
-            tok = self.lookahead
-            self.eat("NUMBER")
-            return NumberNode(tok.lexeme)
-        elif self.lookahead.type == "ID":
-            tok = self.lookahead
-            self.eat("ID")
-            return IdNode(tok.lexeme)
-        else:
-            raise SyntaxError(f"Factor inesperado: {self.lookahead}")
+        raise SyntaxError(f"Factor inesperado: {self._current()}")
+
+@functools.lru_cache(maxsize=1024)
+def parse_cached(text: str) -> ASTNode:
+    return Parser(text).parse()
 
 class Evaluator:
     def __init__(self, symtab: SymbolTable):
         self.symtab = symtab
 
     def eval(self, node: ASTNode) -> float:
-        if isinstance(node, NumberNode):
-            node.val = node.val  
-            return node.val
-        elif isinstance(node, IdNode):
-            sym = self.symtab.get(node.name)
-            if sym is None:
-                raise NameError(f"Identificador no definido: {node.name}")
-            node.val = sym.valor
-            return node.val
-        elif isinstance(node, BinOpNode):
-            left_val = self.eval(node.left)
-            right_val = self.eval(node.right)
-            if node.op == "+":
-                node.val = left_val + right_val
-            elif node.op == "-":
-                node.val = left_val - right_val
-            elif node.op == "*":
-                node.val = left_val * right_val
-            elif node.op == "/":
-                if right_val == 0:
-                    raise ZeroDivisionError("División por cero detectada en la evaluación")
-                node.val = left_val / right_val
+        return node.eval(self.symtab)
+
+    def annotate(self, node: ASTNode) -> Dict[int, Any]:
+        # valor de cada nodo indexado por id(nodo), para print_ast
+        vals: Dict[int, Any] = {}
+
+        def visit(n: ASTNode) -> Any:
+            if isinstance(n, BinOpNode):
+                value = n.fn(visit(n.left), visit(n.right))
             else:
-                raise ValueError(f"Operador desconocido: {node.op}")
-            return node.val
+                value = n.eval(self.symtab)
+            vals[id(n)] = value
+            return value
+
+        visit(node)
+        return vals
+
+class MemoEvaluator(Evaluator):
+    # memoriza subexpresiones mientras no cambie symtab.version; los subárboles
+    # estructuralmente iguales comparten sid, asignado por este evaluador
+    def __init__(self, symtab: SymbolTable):
+        super().__init__(symtab)
+        self.memo: Dict[int, Any] = {}
+        self._version = symtab.version
+        # id(nodo) -> (nodo, sid); se guarda el nodo para que su id no se reutilice
+        self._sids: Dict[int, Tuple[ASTNode, int]] = {}
+        self._keys: Dict[tuple, int] = {}
+
+    def eval(self, node: ASTNode) -> float:
+        if self.symtab.version != self._version:
+            self.memo.clear()
+            self._version = self.symtab.version
+        return self._eval(node)
+
+    def _sid(self, node: ASTNode) -> int:
+        entry = self._sids.get(id(node))
+        if entry is None:
+            if isinstance(node, BinOpNode):
+                key = (node.op, self._sid(node.left), self._sid(node.right))
+            elif isinstance(node, NumberNode):
+                key = ("num",) + _number_key(node.value)
+            else:
+                key = ("id", node.slot)
+            entry = self._sids[id(node)] = (node, self._keys.setdefault(key, len(self._keys)))
+        return entry[1]
+
+    def _eval(self, node: ASTNode) -> Any:
+        if not isinstance(node, BinOpNode):
+            return node.eval(self.symtab)
+        sid = self._sid(node)
+        value = self.memo.get(sid, _MISSING)
+        if value is _MISSING:
+            value = node.fn(self._eval(node.left), self._eval(node.right))
+            self.memo[sid] = value
+        return value
+
+# códigos de operación de la máquina de pila
+OP_PUSH_NUM, OP_PUSH_ID, OP_ADD, OP_SUB, OP_MUL, OP_DIV = range(6)
+
+_BINOP_CODES = {"+": OP_ADD, "-": OP_SUB, "*": OP_MUL, "/": OP_DIV}
+
+def compile_ast(node: ASTNode) -> List[Tuple[int, Any]]:
+    code: List[Tuple[int, Any]] = []
+
+    def emit(n: ASTNode):
+        if isinstance(n, NumberNode):
+            code.append((OP_PUSH_NUM, n.value))
+        elif isinstance(n, IdNode):
+            code.append((OP_PUSH_ID, n.slot))
+        elif isinstance(n, BinOpNode):
+            emit(n.left)
+            emit(n.right)
+            opcode = _BINOP_CODES.get(n.op)
+            if opcode is None:
+                raise ValueError(f"Operador desconocido: {n.op}")
+            code.append((opcode, None))
         else:
             raise TypeError("Nodo AST desconocido")
 
-def print_ast(node: ASTNode, indent: str = ""):
+    emit(node)
+    return code
+
+def run(code: List[Tuple[int, Any]], symtab: SymbolTable) -> float:
+    stack: List[Any] = []
+    push = stack.append
+    pop = stack.pop
+    pc = 0
+    n = len(code)
+    while pc < n:
+        op, arg = code[pc]
+        pc += 1
+        if op == OP_PUSH_NUM:
+            push(arg)
+        elif op == OP_PUSH_ID:
+            push(symtab.value_at(arg))
+        elif op == OP_ADD:
+            right = pop()
+            stack[-1] = stack[-1] + right
+        elif op == OP_SUB:
+            right = pop()
+            stack[-1] = stack[-1] - right
+        elif op == OP_MUL:
+            right = pop()
+            stack[-1] = stack[-1] * right
+        elif op == OP_DIV:
+            right = pop()
+            if right == 0:
+                raise ZeroDivisionError("División por cero detectada en la evaluación")
+            stack[-1] = stack[-1] / right
+        else:
+            raise ValueError(f"Código de operación desconocido: {op}")
+    return stack[-1]
+
+def _run_lowered(ops, consts, var_indices, vars_, stack):
+    sp = 0
+    for pc in range(len(ops)):
+        op = ops[pc]
+        if op == OP_PUSH_NUM:
+            stack[sp] = consts[pc]
+            sp += 1
+        elif op == OP_PUSH_ID:
+            stack[sp] = vars_[var_indices[pc]]
+            sp += 1
+        else:
+            sp -= 1
+            right = stack[sp]
+            if op == OP_ADD:
+                stack[sp - 1] += right
+            elif op == OP_SUB:
+                stack[sp - 1] -= right
+            elif op == OP_MUL:
+                stack[sp - 1] *= right
+            else:
+                if right == 0:
+                    raise ZeroDivisionError("División por cero detectada en la evaluación")
+                stack[sp - 1] /= right
+    return stack[0]
+
+if njit is not None:
+    _run_lowered = njit(cache=True)(_run_lowered)
+
+def lower_code(code: List[Tuple[int, Any]]):
+    # ops/consts/var_indices en paralelo; var_indices apunta a la lista slots.
+    # se conserva code para reproducir el orden de errores de run; si alguna
+    # constante no cabe en float64, ops queda en None y run_jit usa siempre run
+    slots: List[int] = []
+    local: Dict[int, int] = {}
+    ops: List[int] = []
+    consts: List[float] = []
+    var_indices: List[int] = []
+    for op, arg in code:
+        ops.append(op)
+        try:
+            consts.append(float(arg) if op == OP_PUSH_NUM else 0.0)
+        except OverflowError:
+            return None, None, None, slots, code
+        if op == OP_PUSH_ID:
+            if arg not in local:
+                local[arg] = len(slots)
+                slots.append(arg)
+            var_indices.append(local[arg])
+        else:
+            var_indices.append(0)
+    if np is not None:
+        return (np.array(ops, dtype=np.int8), np.array(consts, dtype=np.float64),
+                np.array(var_indices, dtype=np.int64), slots, code)
+    return ops, consts, var_indices, slots, code
+
+def run_jit(lowered, symtab: SymbolTable) -> float:
+    ops, consts, var_indices, slots, code = lowered
+    if ops is None:
+        return run(code, symtab)
+    try:
+        values = [float(symtab.value_at(slot)) for slot in slots]
+    except (NameError, TypeError, ValueError, OverflowError):
+        # algún libre sin definir o sin valor float: run lanza el mismo primer
+        # error que eval
+        return run(code, symtab)
+    if np is not None:
+        vars_ = np.array(values, dtype=np.float64)
+        stack = np.empty(len(ops), dtype=np.float64)
+    else:
+        vars_ = values
+        stack = [0.0] * len(ops)
+    return _run_lowered(ops, consts, var_indices, vars_, stack)
+
+_PY_OPS = {"+": pyast.Add, "-": pyast.Sub, "*": pyast.Mult}
+
+def codegen(node: ASTNode, params: Dict[int, str]) -> pyast.expr:
+    # params asigna a cada slot libre un nombre de parámetro (v0, v1, ...)
+    if isinstance(node, NumberNode):
+        return pyast.Constant(node.value)
+    elif isinstance(node, IdNode):
+        name = params.get(node.slot)
+        if name is None:
+            name = params[node.slot] = f"v{len(params)}"
+        return pyast.Name(id=name, ctx=pyast.Load())
+    elif isinstance(node, BinOpNode):
+        left = codegen(node.left, params)
+        right = codegen(node.right, params)
+        if node.op == "/":
+            # _div conserva la comprobación y el mensaje de la división por cero
+            return pyast.Call(pyast.Name(id="_div", ctx=pyast.Load()), [left, right], [])
+        return pyast.BinOp(left, _PY_OPS[node.op](), right)
+    else:
+        raise TypeError("Nodo AST desconocido")
+
+def compile_function(node: ASTNode):
+    # se compila un ast de Python en vez de texto fuente: sin límite de paréntesis
+    # anidados y sin convertir las constantes a str
+    params: Dict[int, str] = {}
+    body = codegen(node, params)
+    args = pyast.arguments(posonlyargs=[], args=[pyast.arg(arg=p) for p in params.values()],
+                           kwonlyargs=[], kw_defaults=[], defaults=[])
+    tree = pyast.fix_missing_locations(pyast.Expression(pyast.Lambda(args, body)))
+    fn = eval(compile(tree, "<ast>", "eval"), {"_div": _div})
+    return fn, list(params), node
+
+def run_compiled(compiled, symtab: SymbolTable) -> float:
+    fn, slots, node = compiled
+    try:
+        args = [symtab.value_at(slot) for slot in slots]
+    except NameError:
+        # con algún libre sin definir se recorre el árbol, para que el primer error
+        # (por ejemplo una división por cero anterior) sea el mismo que en eval/run
+        return node.eval(symtab)
+    return fn(*args)
+
+def print_ast(node: ASTNode, indent: str = "", vals: Optional[Dict[int, Any]] = None):
+    suffix = f" -> val={vals.get(id(node))}" if vals is not None else ""
     if isinstance(node, NumberNode):
-        print(indent + f"Number({node.number_text}) -> val={node.val}")
+        print(indent + f"Number({node.number_text})" + suffix)
     elif isinstance(node, IdNode):
-        print(indent + f"Id({node.name}) -> val={node.val}")
+        print(indent + f"Id({node.name})" + suffix)
     elif isinstance(node, BinOpNode):
-        print(indent + f"BinOp({node.op}) -> val={node.val}")
+        print(indent + f"BinOp({node.op})" + suffix)
         print(indent + "  L:")
-        print_ast(node.left, indent + "    ")
+        print_ast(node.left, indent + "    ", vals)
         print(indent + "  R:")
-        print_ast(node.right, indent + "    ")
+        print_ast(node.right, indent + "    ", vals)
     else:
         print(indent + f"Unknown node: {node}")
 
@@ -230,10 +593,8 @@ def main():
 
         print(st)
 
-        lexer = Lexer(expr_text)
-        parser = Parser(lexer)
         try:
-            ast = parser.parse()
+            ast = parse_cached(expr_text)
         except Exception as e:
             print("Error de parseo:", e)
             continue
@@ -246,17 +607,15 @@ def main():
             continue
 
         print("\nValor evaluado:", value)
-        print("\nAST decorado (nodos con atributo .val):")
-        print_ast(ast)
+        print("\nAST decorado (valor de cada nodo):")
+        print_ast(ast, vals=evaluator.annotate(ast))
         print()
 
     print("="*60)
     expr_text = "z + 1"
     print("Expresión de ejemplo con error (identificador no definido):", expr_text)
-    lexer = Lexer(expr_text)
-    parser = Parser(lexer)
     try:
-        ast = parser.parse()
+        ast = parse_cached(expr_text)
         st = SymbolTable()  
         evaluator = Evaluator(st)
         evaluator.eval(ast)